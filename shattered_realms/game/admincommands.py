@@ -1,17 +1,23 @@
 # shattered_realms/game/admincommands.py
 
+import asyncio
 from typing import Dict, Callable, List
 
-from .colors import colorize
+from .colors import variants_bytes
+from .models import ROLE_LEVELS, player_key
 
 CommandHandler = Callable[[object, List[str]], object]
 
+# Fixed messages as (plain, colored); index with session.color_enabled.
+_MSG_NO_AUTHORITY = variants_bytes("You lack the authority to reshape destiny.", "error")
+_MSG_NO = variants_bytes("No.", "error")
+_MSG_NOT_ADMIN = variants_bytes("Only a true Admin can rewrite legends.", "error")
+
 
 async def cmd_setrole(session, args: List[str]) -> None:
     """Admin command: setrole <player> <role>"""
     if not session.is_admin():
-        msg = colorize("You lack the authority to reshape destiny.", "error", session.color_enabled)
-        await session.send_line(msg)
+        await session.send_raw(_MSG_NO_AUTHORITY[session.color_enabled])
         return
 
     if len(args) != 2:
@@ -21,17 +27,16 @@ async def cmd_setrole(session, args: List[str]) -> None:
     target_name, new_role = args
     new_role = new_role.lower()
 
-    if new_role not in ("player", "wizard", "gm", "admin"):
+    if new_role not in ROLE_LEVELS:
         await session.send_line("Invalid role. Choose: player, wizard, gm, admin.")
         return
 
-    key = target_name.lower()
-    target = session.world.players.get(key)
+    target = session.world.players.get(player_key(target_name))
     if not target:
         await session.send_line(f"No such player: {target_name}")
         return
 
-    target.role = new_role
+    target.set_role(new_role)
     await session.send_line(f"Role of {target_name} set to {new_role}.")
 
 
@@ -40,7 +45,7 @@ async def cmd_addxp(session, args: List[str]) -> None:
     from .levels import apply_level_up  # local import to avoid circular imports
 
     if not session.is_admin():
-        await session.send_line(colorize("No.", "error", session.color_enabled))
+        await session.send_raw(_MSG_NO[session.color_enabled])
         return
 
     if not args:
@@ -58,7 +63,7 @@ async def cmd_addxp(session, args: List[str]) -> None:
     apply_level_up(player)
 
     msg = f"Gave {amount} XP. You are now level {player.level}."
-    await session.send_line(colorize(msg, "system", session.color_enabled))
+    await session.send_line(session.colorize(msg, "system"))
 
 
 async def cmd_killnpc(session, args: List[str]) -> None:
@@ -67,8 +72,7 @@ async def cmd_killnpc(session, args: List[str]) -> None:
     Usage: killnpc <id-or-name-prefix>
     """
     if not session.is_admin():
-        msg = colorize("Only a true Admin can rewrite legends.", "error", session.color_enabled)
-        await session.send_line(msg)
+        await session.send_raw(_MSG_NOT_ADMIN[session.color_enabled])
         return
 
     if not args:
@@ -84,22 +88,26 @@ async def cmd_killnpc(session, args: List[str]) -> None:
         target_npc = world.npcs[target_arg]
     else:
         # Fallback: prefix match on name
-        for npc in world.npcs.values():
-            if npc.name.lower().startswith(target_arg):
-                target_npc = npc
-                break
+        target_npc = world.find_npc(target_arg)
 
     if not target_npc:
         await session.send_line(f"No NPC found matching '{target_arg}'.")
         return
 
     room_id = target_npc.room_id
-    name_c = colorize(target_npc.name, "npc_name", session.color_enabled)
-
-    for other in world.sessions_in_room(room_id):
-        await other.send_line(f"{name_c} flickers and vanishes from the realm.")
-
-    world.npcs.pop(target_npc.id, None)
+    # Each witness gets the name in their own color mode.
+    line_colored = f"{target_npc.colored_name} flickers and vanishes from the realm."
+    line_plain = f"{target_npc.name} flickers and vanishes from the realm."
+
+    await asyncio.gather(
+        *(
+            other.send_line(line_colored if other.color_enabled else line_plain)
+            for other in world.sessions_in_room(room_id)
+        ),
+        return_exceptions=True,
+    )
+
+    world.remove_npc(target_npc.id)
 
     await session.send_line(f"{target_npc.name} has been removed from the Shattered Realms.")
 
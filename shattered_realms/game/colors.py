@@ -11,11 +11,39 @@ STYLES = {
     "banner": "\033[1;35m",       # bright magenta
 }
 
+# style -> (prefix, suffix), built once so colorize() is a single lookup
+_WRAP = {style: (code, RESET) for style, code in STYLES.items()}
+
+
 def colorize(text: str, style: str, enabled: bool = True) -> str:
-    if not enabled:
-        return text
+    return colorize_on(text, style) if enabled else text
+
+
+def variants(text: str, style: str) -> tuple:
+    """
+    (plain, colored) forms of a fixed message, built once at import.
+    Index with a session's color_enabled to pick one.
+    """
+    return (text, colorize(text, style))
 
-    code = STYLES.get(style)
-    if not code:
+
+def variants_bytes(text: str, style: str) -> tuple:
+    """
+    Like variants(), but pre-encoded as CRLF-terminated lines ready for
+    session.send_raw(). Only for short single-line ASCII messages, which
+    send_line() would pass through unchanged anyway.
+    """
+    return tuple((v + "\r\n").encode("utf-8") for v in variants(text, style))
+
+
+# Two-argument forms bound onto each session as session.colorize, swapped
+# when the player toggles color so no-color sessions skip the lookup.
+def colorize_on(text: str, style: str) -> str:
+    wrap = _WRAP.get(style)
+    if wrap is None:
         return text
-    return f"{code}{text}{RESET}"
+    return f"{wrap[0]}{text}{wrap[1]}"
+
+
+def colorize_off(text: str, style: str) -> str:
+    return text
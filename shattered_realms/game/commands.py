@@ -1,26 +1,55 @@
 # shattered_realms/game/commands.py
 
-from typing import Dict, Callable, List
+import asyncio
+import functools
+import sys
+from typing import Dict, Callable, List, Tuple
 
-from .models import World, Room
-from .colors import colorize
+from .models import World, Room, player_key
+from .colors import colorize, variants, variants_bytes
 from .levels import LEVEL_XP
 from .admincommands import ADMIN_COMMANDS
 from .wizcommands import WIZ_COMMANDS
 
 CommandHandler = Callable[[object, List[str]], object]
 
-# Directions & aliases
+# Directions & aliases (interned: these strings end up as room/exit keys)
 DIRECTION_ALIASES = {
-    "n": "north",
-    "s": "south",
-    "e": "east",
-    "w": "west",
-    "u": "up",
-    "d": "down",
+    "n": sys.intern("north"),
+    "s": sys.intern("south"),
+    "e": sys.intern("east"),
+    "w": sys.intern("west"),
+    "u": sys.intern("up"),
+    "d": sys.intern("down"),
 }
 
-VALID_DIRECTIONS = {"north", "south", "east", "west", "up", "down"}
+VALID_DIRECTIONS = frozenset(map(sys.intern, ["north", "south", "east", "west", "up", "down"]))
+
+_COLOR_ON = frozenset({"on", "yes", "true"})
+_COLOR_OFF = frozenset({"off", "no", "false"})
+
+# Fixed messages as (plain, colored); index with session.color_enabled.
+# Pieces of larger lines stay str:
+_MSG_YOU_GO = {d: variants(f"You go {d}.", "system") for d in VALID_DIRECTIONS}
+_YOU_SAY = variants("You say:", "system")
+_WHO_HEADER = variants("Players currently wandering the Shattered Realms:", "system")
+_YOU_NOTICE = variants("You notice:", "system")
+# Whole lines are pre-encoded for session.send_raw():
+_MSG_NO_EXIT = variants_bytes("You can't go that way.", "error")
+_MSG_UNFORMED = variants_bytes("You feel resistance, as if reality hasn't fully formed that way.", "error")
+_MSG_QUIT = variants_bytes("The world fades to black as you step away...", "system")
+_MSG_SAY_WHAT = variants_bytes("Say what?", "error")
+_MSG_ALONE = variants_bytes("You seem to be alone in these realms.", "system")
+# Status is only ever colored when it's "on"
+_MSG_COLOR_STATUS = (
+    variants_bytes("Color is currently off.", "system")[0],
+    variants_bytes("Color is currently on.", "system")[1],
+)
+_MSG_COLOR_ON = variants_bytes("Color has been turned on.", "system")
+_MSG_COLOR_OFF = b"Color has been turned off.\r\n"
+_MSG_COLOR_USAGE = variants_bytes("Usage: color [on|off]", "error")
+_MSG_NOT_HERE = variants_bytes("You don't see that here.", "error")
+_MSG_UNKNOWN = variants_bytes("You mutter something unintelligible.", "error")
 
 # Player Commands
 
@@ -34,30 +63,12 @@ async def cmd_look(session, args: List[str]) -> None:
 
     # Normal room look
     room = _current_room(session)
-
-    room_name = colorize(room.name, "room_name", session.color_enabled)
-    await session.send_line(room_name)
-    await session.send_line(room.description.rstrip())
-
-    await _show_room_occupants(session)
-
-    # Pretty exit formatting
-    for line in format_exits(session, room):
-        await session.send_line(line)
+    await session.send_lines(_room_lines(session, room, room.description))
 
 async def cmd_quicklook(session, args: List[str]) -> None:
     """Brief room description (`ql`)."""
     room = _current_room(session)
-
-    room_name = colorize(room.name, "room_name", session.color_enabled)
-    await session.send_line(room_name)
-    await session.send_line(room.brief.rstrip())
-
-    await _show_room_occupants(session)
-
-    # Pretty exit formatting
-    for line in format_exits(session, room):
-        await session.send_line(line)
+    await session.send_lines(_room_lines(session, room, room.brief))
 
 async def cmd_move(session, args: List[str], direction: str) -> None:
     """Move the player in a direction, if possible."""
@@ -65,8 +76,7 @@ async def cmd_move(session, args: List[str], direction: str) -> None:
     exits = room.exits or {}
 
     if direction not in exits:
-        msg = colorize("You can't go that way.", "error", session.color_enabled)
-        await session.send_line(msg)
+        await session.send_raw(_MSG_NO_EXIT[session.color_enabled])
         return
 
     dest_id = exits[direction]
@@ -75,101 +85,109 @@ async def cmd_move(session, args: List[str], direction: str) -> None:
     try:
         session.world.get_room(dest_id)
     except KeyError:
-        msg = colorize(
-            "You feel resistance, as if reality hasn't fully formed that way.",
-            "error",
-            session.color_enabled,
-        )
-        await session.send_line(msg)
+        await session.send_raw(_MSG_UNFORMED[session.color_enabled])
         return
 
-    name = session.player.name if session.player else "Someone"
+    # Only two possible renderings of the name; the player caches both.
+    if session.player:
+        name_plain, name_colored = session.player.name, session.player.colored_name
+    else:
+        name_plain = "Someone"
+        name_colored = colorize(name_plain, "player_name")
 
     # Notify old room
+    coros = []
     for other in session.world.sessions_in_room(session.room_id):
         if other is session:
             continue
-        colored_name = colorize(name, "player_name", other.color_enabled)
-        await other.send_line(f"{colored_name} leaves the room.")
+        colored_name = name_colored if other.color_enabled else name_plain
+        coros.append(other.send_line(f"{colored_name} leaves the room."))
+    await asyncio.gather(*coros, return_exceptions=True)
 
     # Actually move
-    session.room_id = dest_id
+    session.move_to(dest_id)
 
     # Notify new room
+    coros = []
     for other in session.world.sessions_in_room(session.room_id):
         if other is session:
             continue
-        colored_name = colorize(name, "player_name", other.color_enabled)
-        await other.send_line(f"{colored_name} enters the room.")
+        colored_name = name_colored if other.color_enabled else name_plain
+        coros.append(other.send_line(f"{colored_name} enters the room."))
+    await asyncio.gather(*coros, return_exceptions=True)
 
-    move_text = colorize(f"You go {direction}.", "system", session.color_enabled)
-    await session.send_line(move_text)
-    await cmd_quicklook(session, [])
+    # Confirmation plus the quick look at the new room, in one write
+    move_text = _MSG_YOU_GO[direction][session.color_enabled]
+    dest = _current_room(session)
+    await session.send_lines([move_text, *_room_lines(session, dest, dest.brief)])
 
 async def cmd_quit(session, args: List[str]) -> bool:
     """Quit the game. Returns False to signal disconnect."""
-    msg = colorize("The world fades to black as you step away...", "system", session.color_enabled)
-    await session.send_line(msg)
+    await session.send_raw(_MSG_QUIT[session.color_enabled])
     return False
 
         
 async def cmd_say(session, args: List[str]) -> None:
     """Speak to everyone in the same room."""
     if not args:
-        msg = colorize("Say what?", "error", session.color_enabled)
-        await session.send_line(msg)
+        await session.send_raw(_MSG_SAY_WHAT[session.color_enabled])
         return
 
     msg_text = " ".join(args)
-    name = session.player.name if session.player else "Someone"
+    if session.player:
+        name_plain, name_colored = session.player.name, session.player.colored_name
+    else:
+        name_plain = "Someone"
+        name_colored = colorize(name_plain, "player_name")
+
+    self_line = f"{_YOU_SAY[session.color_enabled]} {msg_text}"
+    line_colored = f"{name_colored} says: {msg_text}"
+    line_plain = f"{name_plain} says: {msg_text}"
 
+    coros = []
     for other in session.world.sessions_in_room(session.room_id):
         if other is session:
-            you_line = colorize("You say:", "system", session.color_enabled)
-            await other.send_line(f"{you_line} {msg_text}")
+            coros.append(other.send_line(self_line))
         else:
-            colored_name = colorize(name, "player_name", other.color_enabled)
-            await other.send_line(f"{colored_name} says: {msg_text}")
+            coros.append(other.send_line(line_colored if other.color_enabled else line_plain))
+    # One broken pipe shouldn't stop everyone else hearing it.
+    await asyncio.gather(*coros, return_exceptions=True)
 
 async def cmd_who(session, args: List[str]) -> None:
     """Show who is online."""
-    players = list(session.world.players.values())
-    if not players:
-        msg = colorize("You seem to be alone in these realms.", "system", session.color_enabled)
-        await session.send_line(msg)
+    world = session.world
+    if not world.players:
+        await session.send_raw(_MSG_ALONE[session.color_enabled])
         return
 
-    header = colorize("Players currently wandering the Shattered Realms:", "system", session.color_enabled)
-    await session.send_line(header)
-    for p in players:
-        pname = colorize(p.name, "player_name", session.color_enabled)
-        await session.send_line(f"  {pname}")
+    # The listing only changes when someone logs in or out, and World
+    # clears who_cache when that happens.
+    cache = world.who_cache
+    if cache is None:
+        players = list(world.players.values())
+        cache = world.who_cache = (_render_who(players, False), _render_who(players, True))
+    await session.send_raw(cache[session.color_enabled])
 
 async def cmd_color(session, args: List[str]) -> None:
     # No args: just show current status
     if not args:
-        status = "on" if session.color_enabled else "off"
-        msg = f"Color is currently {status}."
-        msg = colorize(msg, "system", session.color_enabled)
-        await session.send_line(msg)
+        await session.send_raw(_MSG_COLOR_STATUS[session.color_enabled])
         return
 
     choice = args[0].lower()
 
-    if choice in ("on", "yes", "true"):
-        session.color_enabled = True
+    if choice in _COLOR_ON:
+        session.set_color(True)
         # Use the *new* state when colorizing
-        msg = colorize("Color has been turned on.", "system", session.color_enabled)
-        await session.send_line(msg)
-    elif choice in ("off", "no", "false"):
+        await session.send_raw(_MSG_COLOR_ON[session.color_enabled])
+    elif choice in _COLOR_OFF:
         # Turn it off first, then send plain confirmation
-        session.color_enabled = False
+        session.set_color(False)
         # Don't color this, since color is now off
-        await session.send_line("Color has been turned off.")
+        await session.send_raw(_MSG_COLOR_OFF)
     else:
         # Invalid usage
-        msg = colorize("Usage: color [on|off]", "error", session.color_enabled)
-        await session.send_line(msg)
+        await session.send_raw(_MSG_COLOR_USAGE[session.color_enabled])
 
 async def cmd_stats(session, args):
     """Show your HP, stamina, level, and XP."""
@@ -181,13 +199,12 @@ async def cmd_stats(session, args):
         f"Health: {p.hp} / {p.max_hp}",
         f"Stamina: {p.stamina} / {p.max_stamina}",
     ]
-    for line in lines:
-        await session.send_line(colorize(line, "system", session.color_enabled))
+    await session.send_lines(session.colorize(line, "system") for line in lines)
 
 async def cmd_role(session, args: List[str]) -> None:
     """Show your current role."""
     role = session.player.role if session.player else "unknown"
-    msg = colorize(f"Your role is: {role}", "system", session.color_enabled)
+    msg = session.colorize(f"Your role is: {role}", "system")
     await session.send_line(msg)
 
 # End Player Commands
@@ -197,10 +214,34 @@ async def cmd_role(session, args: List[str]) -> None:
 def _current_room(session) -> Room:
     return session.world.get_room(session.room_id)
 
-async def _show_room_occupants(session) -> None:
+def _render_who(players, color: bool) -> bytes:
+    """Encoded who listing; names are short alphanumerics, so no wrapping."""
+    lines = [_WHO_HEADER[color]]
+    lines.extend(f"  {p.colored_name if color else p.name}" for p in players)
+    return "".join(line + "\r\n" for line in lines).encode("utf-8", errors="ignore")
+
+def _room_lines(session, room: Room, text: str) -> List[str]:
+    """Room name, the given description text, occupants and exits."""
+    lines = [
+        session.colorize(room.name, "room_name"),
+        text.rstrip(),
+    ]
+    lines.extend(_room_occupant_lines(session))
+    # Pretty exit formatting
+    lines.extend(format_exits(session, room))
+    return lines
+
+def _room_occupant_lines(session) -> List[str]:
     """
-    Show other players and NPCs in the same room.
+    Lines describing other players and NPCs in the same room.
     """
+    # Most rooms hold nobody but you; skip the work entirely.
+    n_sessions, n_npcs = session.world.room_counts(session.room_id)
+    if n_sessions <= 1 and not n_npcs:
+        return []
+
+    lines: List[str] = []
+
     # Players (other than you)
     other_players = []
     for other in session.world.sessions_in_room(session.room_id):
@@ -208,26 +249,24 @@ async def _show_room_occupants(session) -> None:
             continue
         if other.player is None:
             continue
-        other_players.append(other.player.name)
+        other_players.append(other.player.colored_name_for(session))
 
     if other_players:
-        colored = [
-            colorize(name, "player_name", session.color_enabled)
-            for name in other_players
-        ]
-        names = ", ".join(colored)
-        await session.send_line(f"Also here: {names}")
+        names = ", ".join(other_players)
+        lines.append(f"Also here: {names}")
 
     # NPCs
     npcs = session.world.npcs_in_room(session.room_id)
     if npcs:
-        await session.send_line(colorize("You notice:", "system", session.color_enabled))
+        lines.append(_YOU_NOTICE[session.color_enabled])
         for npc in npcs:
-            name_c = colorize(npc.name, "npc_name", session.color_enabled)
+            name_c = npc.colored_name_for(session)
             if getattr(npc, "description", None):
-                await session.send_line(f"  {name_c}, {npc.description}")
+                lines.append(f"  {name_c}, {npc.description}")
             else:
-                await session.send_line(f"  {name_c}")
+                lines.append(f"  {name_c}")
+
+    return lines
 
 async def _look_target(session, target: str) -> None:
     """
@@ -241,68 +280,50 @@ async def _look_target(session, target: str) -> None:
     room_id = session.room_id
 
     # 1) Check NPCs in the room
-    npcs = session.world.npcs_in_room(room_id)
-    for npc in npcs:
-        if npc.name.lower().startswith(target_l):
-            name_c = colorize(npc.name, "npc_name", session.color_enabled)
-            await session.send_line(name_c)
-            if getattr(npc, "description", None):
-                await session.send_line(npc.description)
-            # Optional: show basic stats if present
-            if hasattr(npc, "level") or hasattr(npc, "hp"):
-                parts = []
-                if hasattr(npc, "level"):
-                    parts.append(f"Level {getattr(npc, 'level')}")
-                if hasattr(npc, "hp") and hasattr(npc, "max_hp"):
-                    parts.append(f"Health: {npc.hp}/{npc.max_hp}")
-                if parts:
-                    await session.send_line(colorize("  " + " | ".join(parts), "system", session.color_enabled))
-            return
+    npc = session.world.find_npc(target_l, room_id)
+    if npc is not None:
+        lines = [npc.colored_name_for(session)]
+        if getattr(npc, "description", None):
+            lines.append(npc.description)
+        # Optional: show basic stats if present
+        if hasattr(npc, "level") or hasattr(npc, "hp"):
+            parts = []
+            if hasattr(npc, "level"):
+                parts.append(f"Level {getattr(npc, 'level')}")
+            if hasattr(npc, "hp") and hasattr(npc, "max_hp"):
+                parts.append(f"Health: {npc.hp}/{npc.max_hp}")
+            if parts:
+                lines.append(session.colorize("  " + " | ".join(parts), "system"))
+        await session.send_lines(lines)
+        return
 
     # 2) Check other players in the room
+    target_key = player_key(target_l)
     for other in session.world.sessions_in_room(room_id):
         if other is session:
             continue
         if not other.player:
             continue
-        if other.player.name.lower().startswith(target_l):
-            pname_c = colorize(other.player.name, "player_name", session.color_enabled)
-            await session.send_line(pname_c)
+        if other.player.key.startswith(target_key):
+            pname_c = other.player.colored_name_for(session)
             # Simple player info for now
             p = other.player
             line = f"Level {p.level} {p.role}"
-            await session.send_line(colorize(line, "system", session.color_enabled))
+            await session.send_lines([pname_c, session.colorize(line, "system")])
             return
 
     # If nothing matched
-    msg = colorize("You don't see that here.", "error", session.color_enabled)
-    await session.send_line(msg)
+    await session.send_raw(_MSG_NOT_HERE[session.color_enabled])
 
-def format_exits(session, room: Room) -> List[str]:
+def format_exits(session, room: Room) -> Tuple[str, ...]:
     """
-    Returns a list of lines showing exits in a nice formatted way:
+    Returns lines showing exits in a nice formatted way:
         Exits:
           East -> Dusty Antechamber
+    Rendered once per room by World.resolve_exits(); this just picks the
+    plain or colored variant.
     """
-    if not room.exits:
-        return [colorize("Exits: none", "system", session.color_enabled)]
-
-    lines = [colorize("Exits:", "system", session.color_enabled)]
-
-    for direction in sorted(room.exits.keys()):
-        dest_id = room.exits[direction]
-        try:
-            dest_room = session.world.get_room(dest_id)
-            dest_name = dest_room.name
-        except KeyError:
-            dest_name = "(unknown)"
-
-        dir_c = colorize(direction.capitalize(), "player_name", session.color_enabled)
-        name_c = colorize(dest_name, "room_name", session.color_enabled)
-
-        lines.append(f"  {dir_c} -> {name_c}")
-
-    return lines
+    return room.exit_lines[session.color_enabled]
 
 # End Helper Functions
 
@@ -310,8 +331,6 @@ def format_exits(session, room: Room) -> List[str]:
 # Handlers return:
 #   - True / None  => keep connection open
 #   - False        => server will close connection
-CommandHandler = Callable[[object, List[str]], object]
-
 BASE_COMMANDS: Dict[str, CommandHandler] = {
     "look": cmd_look,
     "ql": cmd_quicklook,
@@ -329,6 +348,47 @@ COMMANDS: Dict[str, CommandHandler] = {
     **ADMIN_COMMANDS,
 }
 
+# Single lookup table for every verb the parser understands, including
+# movement: each direction (and its n/s/e/w/u/d alias) maps to cmd_move
+# with the direction bound in. Directions are added last so they win over
+# any same-named command, matching the old alias -> direction -> command
+# check order.
+DISPATCH: Dict[str, CommandHandler] = dict(COMMANDS)
+DISPATCH.update(
+    {direction: functools.partial(cmd_move, direction=direction) for direction in VALID_DIRECTIONS}
+)
+DISPATCH.update({alias: DISPATCH[full] for alias, full in DIRECTION_ALIASES.items()})
+
+# Never abbreviated: typing part of these shouldn't drop your connection.
+_NO_ABBREV = frozenset({"quit", "exit"})
+
+
+def _abbreviations(table: Dict[str, CommandHandler], verbs) -> Dict[str, CommandHandler]:
+    """
+    Every prefix of `verbs` that matches exactly one verb in `table` and
+    isn't already a verb itself ("lo" -> look, "sta" -> stats, "nor" -> north).
+    """
+    owners: Dict[str, set] = {}
+    for verb in table:
+        for i in range(1, len(verb)):
+            owners.setdefault(verb[:i], set()).add(verb)
+
+    abbrevs: Dict[str, CommandHandler] = {}
+    for verb in verbs:
+        for i in range(1, len(verb)):
+            prefix = verb[:i]
+            if prefix not in table and owners[prefix] == {verb}:
+                abbrevs[prefix] = table[verb]
+    return abbrevs
+
+
+# Unambiguous abbreviations of player commands and directions go straight
+# into DISPATCH, so they still resolve with a single lookup. Admin/wizard
+# verbs count towards ambiguity but must be typed in full.
+DISPATCH.update(
+    _abbreviations(DISPATCH, (set(BASE_COMMANDS) - _NO_ABBREV) | VALID_DIRECTIONS)
+)
+
 
 async def handle_command(session, line: str) -> bool:
     """
@@ -343,28 +403,15 @@ async def handle_command(session, line: str) -> bool:
         await cmd_quicklook(session, [])
         return True
 
-    parts = text.split()
-    if not parts:
-        await cmd_quicklook(session, [])
-        return True
-
+    # Only split the verb off; most commands (directions, look, ql) have
+    # no arguments at all.
+    parts = text.split(None, 1)
     verb = parts[0].lower()
-    args = parts[1:]
-
-    # Direction shortcuts (n/s/e/w/u/d)
-    if verb in DIRECTION_ALIASES:
-        verb = DIRECTION_ALIASES[verb]
-
-    # Cardinal directions as movement commands
-    if verb in VALID_DIRECTIONS:
-        await cmd_move(session, args, verb)
-        return True
+    args = parts[1].split() if len(parts) > 1 else []
 
-    # Normal command lookup
-    handler = COMMANDS.get(verb)
+    handler = DISPATCH.get(verb)
     if handler is None:
-        msg = colorize("You mutter something unintelligible.", "error", session.color_enabled)
-        await session.send_line(msg)
+        await session.send_raw(_MSG_UNKNOWN[session.color_enabled])
         return True
 
     result = await handler(session, args)
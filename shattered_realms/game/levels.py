@@ -1,3 +1,5 @@
+from bisect import bisect_right
+
 # XP required to *reach* that level.
 # Level 1 = starting point (0 XP).
 LEVEL_XP = {
@@ -35,31 +37,50 @@ LEVEL_XP = {
 
 MAX_LEVEL = 30
 
+# LEVEL_XP sorted by XP, so the level for any XP total is one bisect away.
+_XP_SORTED = sorted((xp, level) for level, xp in LEVEL_XP.items())
+_XP_ONLY = [xp for xp, _ in _XP_SORTED]
+
+# Stat growth per level — tweak as needed
+HP_PER_LEVEL = 5
+STAMINA_PER_LEVEL = 2
+
+
+def level_for_xp(xp: int) -> int:
+    """
+    Highest level (capped at MAX_LEVEL) whose XP requirement `xp` meets.
+    """
+    idx = bisect_right(_XP_ONLY, xp) - 1
+    if idx < 0:
+        return 1
+    return min(_XP_SORTED[idx][1], MAX_LEVEL)
+
 
 def can_level_up(player) -> bool:
     """
     Returns True if the player's XP qualifies them for a level-up.
     """
-    if player.level >= MAX_LEVEL:
-        return False
-    next_level = player.level + 1
-    return player.xp >= LEVEL_XP[next_level]
+    return level_for_xp(player.xp) > player.level
 
 
 def apply_level_up(player):
     """
     Actually increases player level and upgrades stats.
-    Called repeatedly until the player reaches appropriate level.
+    Jumps straight to the level the player's XP qualifies for, applying
+    the stat gains for every level crossed in one go.
     """
-    while can_level_up(player):
-        player.level += 1
+    new_level = level_for_xp(player.xp)
+    gained = new_level - player.level
+    if gained <= 0:
+        return
+
+    player.level = new_level
 
-        # Stat growth curve — tweak as needed
-        player.max_hp += 5
-        player.hp = player.max_hp  # heal on level-up
+    player.max_hp += HP_PER_LEVEL * gained
+    player.hp = player.max_hp  # heal on level-up
 
-        player.max_stamina += 2
-        player.stamina = player.max_stamina
+    player.max_stamina += STAMINA_PER_LEVEL * gained
+    player.stamina = player.max_stamina
 
-        # Narrative puff
-        print(f"{player.name} has advanced to level {player.level}!")
+    # Narrative puff
+    print(f"{player.name} has advanced to level {player.level}!")
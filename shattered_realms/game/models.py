@@ -1,5 +1,36 @@
+import sys
+import zlib
+from bisect import bisect_left, insort
 from dataclasses import dataclass, field
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple, Union
+
+from .colors import colorize
+
+
+def player_key(name: str) -> str:
+    """
+    Case-insensitive key for a player name (casefold handles ß etc.).
+    Safe to call on arbitrary input: only Player keys get interned.
+    """
+    return name.casefold()
+
+
+def _key_of(who: Union["Player", str]) -> str:
+    return who.key if isinstance(who, Player) else player_key(who)
+
+
+# Role name -> rank; higher ranks include the powers of lower ones.
+ROLE_PLAYER, ROLE_WIZARD, ROLE_GM, ROLE_ADMIN = range(4)
+ROLE_LEVELS = {
+    "player": ROLE_PLAYER,
+    "wizard": ROLE_WIZARD,
+    "gm": ROLE_GM,
+    "admin": ROLE_ADMIN,
+}
+
+# Wandering NPCs are split into this many groups, ticked one group at a
+# time so their movement is spread out instead of arriving in one burst.
+NPC_TICK_BUCKETS = 10
 
 
 @dataclass
@@ -11,8 +42,17 @@ class Room:
     exits: Dict[str, str] = field(default_factory=dict)
     sanctuary: bool = False  # rooms can be marked as safe zones
 
+    # Exit destination ids, for random.choice without building a list
+    exit_values: Tuple[str, ...] = field(default=(), init=False, repr=False, compare=False)
+    # Rendered exit listing, indexed by color_enabled: (plain, colored);
+    # filled in by World.resolve_exits() so listings never look rooms up.
+    exit_lines: Tuple[Tuple[str, ...], Tuple[str, ...]] = field(
+        default=(("Exits: none",), (colorize("Exits: none", "system"),)),
+        init=False, repr=False, compare=False,
+    )
 
-@dataclass
+
+@dataclass(slots=True)
 class Player:
     name: str
     room_id: str
@@ -29,7 +69,31 @@ class Player:
     stamina: int = 10
     max_stamina: int = 10
 
-@dataclass
+    # case-folded name, computed once; the key in World.players / sessions
+    key: str = field(init=False, repr=False, compare=False)
+    # ANSI-colored name, built once (names never change after creation)
+    colored_name: str = field(init=False, repr=False, compare=False)
+    # ROLE_LEVELS rank of `role`, for permission checks; change roles with
+    # set_role() so the two stay in step.
+    role_level: int = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        # Interned so World.players / sessions hits match by identity; only
+        # real players get here, so the intern table stays bounded.
+        self.key = sys.intern(player_key(self.name))
+        self.colored_name = colorize(self.name, "player_name")
+        self.role_level = ROLE_LEVELS.get(self.role, ROLE_PLAYER)
+
+    def set_role(self, role: str) -> None:
+        self.role = role
+        self.role_level = ROLE_LEVELS.get(role, ROLE_PLAYER)
+
+    def colored_name_for(self, viewer) -> str:
+        """Name as it should appear to `viewer` (any object with color_enabled)."""
+        return self.colored_name if viewer.color_enabled else self.name
+
+
+@dataclass(slots=True)
 class NPC:
     id: str
     name: str
@@ -46,15 +110,49 @@ class NPC:
     hp: int = 10
     invulnerable: bool = False
 
+    # lowercase name, computed once for prefix lookups
+    _name_lc: str = field(init=False, repr=False, compare=False)
+    # ANSI-colored name, built once (names never change after creation)
+    colored_name: str = field(init=False, repr=False, compare=False)
+    # which NPC tick group this NPC moves with (stable across restarts)
+    tick_bucket: int = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        self._name_lc = self.name.lower()
+        self.tick_bucket = zlib.crc32(self.id.encode("utf-8")) % NPC_TICK_BUCKETS
+        self.colored_name = colorize(self.name, "npc_name")
+
+    def colored_name_for(self, viewer) -> str:
+        """Name as it should appear to `viewer` (any object with color_enabled)."""
+        return self.colored_name if viewer.color_enabled else self.name
+
 class World:
     def __init__(self):
         self.rooms: Dict[str, Room] = {}
-        # key = lowercase name
+        # key = player_key(name)
         self.players: Dict[str, Player] = {}
-        # active connections: key = lowercase player name, value = session object
+        # Rendered 'who' listing (plain, colored); reset whenever players
+        # are added or removed.
+        self.who_cache: Optional[Tuple[bytes, bytes]] = None
+        # active connections: key = player_key(name), value = session object
         self.sessions: Dict[str, object] = {}
         # NPCs keyed by id
         self.npcs: Dict[str, NPC] = {}
+        # Subset of npcs that wander (untethered, mode != "none"); the NPC
+        # tick only walks these.
+        self.mobile_npcs: Dict[str, NPC] = {}
+        # tick bucket -> mobile NPCs in it
+        self._mobile_by_bucket: Dict[int, Dict[str, NPC]] = {}
+
+        # Reverse indexes: room id -> occupants, kept in arrival order.
+        # Sessions are stored as keys of a dict used as an ordered set.
+        self._players_by_room: Dict[str, Dict[str, Player]] = {}
+        self._sessions_by_room: Dict[str, Dict[object, None]] = {}
+        self._npcs_by_room: Dict[str, Dict[str, NPC]] = {}
+        # sorted (lowercase name, id) pairs for prefix lookup via bisect,
+        # world-wide and per room
+        self._npc_names: List[Tuple[str, str]] = []
+        self._npc_names_by_room: Dict[str, List[Tuple[str, str]]] = {}
 
     # ---- Rooms ----
     def add_room(self, room: Room) -> None:
@@ -65,40 +163,181 @@ class World:
             raise KeyError(f"Unknown room id: {room_id}")
         return self.rooms[room_id]
 
+    def resolve_exits(self, room: Optional[Room] = None) -> None:
+        """
+        Precompute exit destination names for one room, or for every room.
+        Call again after changing a room's exits.
+        """
+        targets = [room] if room is not None else self.rooms.values()
+        for r in targets:
+            # (direction, dest_id, dest_name), sorted by direction
+            resolved = []
+            for direction in sorted(r.exits):
+                dest_id = r.exits[direction]
+                dest = self.rooms.get(dest_id)
+                resolved.append((direction, dest_id, dest.name if dest else "(unknown)"))
+            r.exit_values = tuple(r.exits.values())
+            r.exit_lines = (_render_exits(resolved, False), _render_exits(resolved, True))
+
     # ---- Players ----
+    # Lookups accept a Player (uses its precomputed key) or a name.
     def add_player(self, player: Player) -> None:
-        key = player.name.lower()
+        key = player.key
+        old = self.players.get(key)
+        if old is not None:
+            _bucket_discard(self._players_by_room, old.room_id, key)
         self.players[key] = player
+        self.who_cache = None
+        _bucket_add(self._players_by_room, player.room_id, key, player)
 
-    def remove_player(self, name: str) -> None:
-        key = name.lower()
-        self.players.pop(key, None)
+    def remove_player(self, who: Union[Player, str]) -> None:
+        key = _key_of(who)
+        player = self.players.pop(key, None)
+        if player is not None:
+            self.who_cache = None
+            _bucket_discard(self._players_by_room, player.room_id, key)
 
-    def get_player(self, name: str) -> Player:
-        key = name.lower()
-        return self.players[key]
+    def get_player(self, who: Union[Player, str]) -> Player:
+        return self.players[_key_of(who)]
 
     def players_in_room(self, room_id: str) -> List[Player]:
-        return [p for p in self.players.values() if p.room_id == room_id]
+        return list(self._players_by_room.get(room_id, {}).values())
 
     # ---- Sessions ----
-    def add_session(self, name: str, session: object) -> None:
-        key = name.lower()
+    def add_session(self, who: Union[Player, str], session: object) -> None:
+        key = _key_of(who)
+        old = self.sessions.get(key)
+        if old is not None:
+            _bucket_discard(self._sessions_by_room, old.room_id, old)
         self.sessions[key] = session
+        _bucket_add(self._sessions_by_room, session.room_id, session, None)
+
+    def remove_session(self, who: Union[Player, str]) -> None:
+        key = _key_of(who)
+        session = self.sessions.pop(key, None)
+        if session is not None:
+            _bucket_discard(self._sessions_by_room, session.room_id, session)
 
-    def remove_session(self, name: str) -> None:
-        key = name.lower()
-        self.sessions.pop(key, None)
+    def move_session(self, session: object, old_room_id: str, new_room_id: str) -> None:
+        """
+        Keep the room indexes in step when a registered session (and its
+        player) changes rooms.
+        """
+        if _bucket_discard(self._sessions_by_room, old_room_id, session):
+            _bucket_add(self._sessions_by_room, new_room_id, session, None)
+
+        player = session.player
+        if player is not None:
+            key = player.key
+            if _bucket_discard(self._players_by_room, old_room_id, key):
+                _bucket_add(self._players_by_room, new_room_id, key, player)
 
     def sessions_in_room(self, room_id: str) -> List[object]:
-        return [
-            s for s in self.sessions.values()
-            if getattr(s, "room_id", None) == room_id
-        ]
+        # Snapshot, so callers can await while iterating.
+        return list(self._sessions_by_room.get(room_id, ()))
 
     # ---- NPCs ----
     def add_npc(self, npc: NPC) -> None:
+        if npc.id in self.npcs:
+            self.remove_npc(npc.id)
         self.npcs[npc.id] = npc
+        if not npc.tethered and (npc.wander_mode or "none").lower() != "none":
+            self.mobile_npcs[npc.id] = npc
+            _bucket_add(self._mobile_by_bucket, npc.tick_bucket, npc.id, npc)
+        _bucket_add(self._npcs_by_room, npc.room_id, npc.id, npc)
+        key = (npc._name_lc, npc.id)
+        insort(self._npc_names, key)
+        insort(self._npc_names_by_room.setdefault(npc.room_id, []), key)
+
+    def remove_npc(self, npc_id: str) -> Optional[NPC]:
+        npc = self.npcs.pop(npc_id, None)
+        if npc is None:
+            return None
+        if self.mobile_npcs.pop(npc.id, None) is not None:
+            _bucket_discard(self._mobile_by_bucket, npc.tick_bucket, npc.id)
+        _bucket_discard(self._npcs_by_room, npc.room_id, npc.id)
+        key = (npc._name_lc, npc.id)
+        _index_discard(self._npc_names, key)
+        _index_discard(self._npc_names_by_room.get(npc.room_id, []), key)
+        return npc
+
+    def move_npc(self, npc: NPC, dest_id: str) -> None:
+        # Removed (e.g. killed) since the caller looked it up: don't put
+        # it back into the room indexes.
+        if self.npcs.get(npc.id) is not npc:
+            return
+        key = (npc._name_lc, npc.id)
+        _bucket_discard(self._npcs_by_room, npc.room_id, npc.id)
+        _index_discard(self._npc_names_by_room.get(npc.room_id, []), key)
+        npc.room_id = dest_id
+        _bucket_add(self._npcs_by_room, dest_id, npc.id, npc)
+        insort(self._npc_names_by_room.setdefault(dest_id, []), key)
+
+    def find_npc(self, prefix: str, room_id: Optional[str] = None) -> Optional[NPC]:
+        """
+        First NPC (alphabetically) whose lowercase name starts with `prefix`.
+        Searches the whole world, or only `room_id` if given.
+        """
+        if room_id is None:
+            index = self._npc_names
+        else:
+            index = self._npc_names_by_room.get(room_id)
+            if not index:
+                return None
+
+        i = bisect_left(index, (prefix,))
+        if i < len(index) and index[i][0].startswith(prefix):
+            return self.npcs.get(index[i][1])
+        return None
 
     def npcs_in_room(self, room_id: str) -> List[NPC]:
-        return [n for n in self.npcs.values() if n.room_id == room_id]
+        return list(self._npcs_by_room.get(room_id, {}).values())
+
+    def mobile_npcs_in_bucket(self, bucket: int) -> List[NPC]:
+        return list(self._mobile_by_bucket.get(bucket, {}).values())
+
+    # ---- Occupancy ----
+    def room_counts(self, room_id: str) -> Tuple[int, int]:
+        """(sessions, NPCs) currently in a room, without building any lists."""
+        return (
+            len(self._sessions_by_room.get(room_id, ())),
+            len(self._npcs_by_room.get(room_id, ())),
+        )
+
+
+def _render_exits(resolved: List[Tuple[str, str, str]], color: bool) -> Tuple[str, ...]:
+    """
+    Exit listing lines, e.g.:
+        Exits:
+          East -> Dusty Antechamber
+    """
+    if not resolved:
+        return (colorize("Exits: none", "system", color),)
+
+    lines = [colorize("Exits:", "system", color)]
+    for direction, _dest_id, dest_name in resolved:
+        dir_c = colorize(direction.capitalize(), "player_name", color)
+        name_c = colorize(dest_name, "room_name", color)
+        lines.append(f"  {dir_c} -> {name_c}")
+    return tuple(lines)
+
+
+def _bucket_add(index: Dict[str, dict], room_id: str, key, value) -> None:
+    index.setdefault(room_id, {})[key] = value
+
+
+def _bucket_discard(index: Dict[str, dict], room_id: str, key) -> bool:
+    """Remove `key` from a room bucket; returns False if it wasn't there."""
+    bucket = index.get(room_id)
+    if bucket is None or key not in bucket:
+        return False
+    del bucket[key]
+    if not bucket:
+        del index[room_id]
+    return True
+
+
+def _index_discard(index: List[Tuple[str, str]], key: Tuple[str, str]) -> None:
+    i = bisect_left(index, key)
+    if i < len(index) and index[i] == key:
+        del index[i]
@@ -1,13 +1,11 @@
 # shattered_realms/game/npcs.py
 
+import asyncio
 import random
 from pathlib import Path
-from typing import Dict
 
-import yaml
-
-from .models import World, NPC
-from .colors import colorize
+from .models import World, NPC, NPC_TICK_BUCKETS
+from .world import load_yaml
 
 def load_npcs(world: World) -> None:
     """
@@ -20,59 +18,60 @@ def load_npcs(world: World) -> None:
         # No NPCs defined yet; that's fine.
         return
 
-    with npc_path.open("r", encoding="utf-8") as f:
-        raw = yaml.safe_load(f) or {}
+    raw = load_yaml(npc_path)
 
     for npc_id, data in raw.get("npcs", {}).items():
         room_id = data.get("room")
         if not room_id:
             continue  # must have a starting room
 
-    npc = NPC(
-        id=npc_id,
-        name=data.get("name", npc_id),
-        description=data.get("description", ""),
-        room_id=room_id,
-        home_id=data.get("home", room_id),
-        tethered=bool(data.get("tethered", False)),
-        wander_mode=data.get("wander_mode", "none"),
-        wander_path=data.get("wander_path", []) or [],
-        aggro=int(data.get("aggro", 0)),
-        level=int(data.get("level", 1)),
-        max_hp=int(data.get("max_hp", 10)),
-        hp=int(data.get("hp", data.get("max_hp", 10))),
-        invulnerable=bool(data.get("invulnerable", False)),
-    )
-    
-    world.add_npc(npc)
+        npc = NPC(
+            id=npc_id,
+            name=data.get("name", npc_id),
+            description=data.get("description", ""),
+            room_id=room_id,
+            home_id=data.get("home", room_id),
+            tethered=bool(data.get("tethered", False)),
+            wander_mode=data.get("wander_mode", "none"),
+            wander_path=data.get("wander_path", []) or [],
+            aggro=int(data.get("aggro", 0)),
+            level=int(data.get("level", 1)),
+            max_hp=int(data.get("max_hp", 10)),
+            hp=int(data.get("hp", data.get("max_hp", 10))),
+            invulnerable=bool(data.get("invulnerable", False)),
+        )
+
+        world.add_npc(npc)
+
+
+# Each wandering NPC moves once per this many seconds.
+NPC_MOVE_INTERVAL = 10.0
 
 
-async def npc_tick(world: World) -> None:
+async def npc_tick_bucket(world: World, bucket: int) -> None:
     """
-    Advance NPC behavior one 'tick':
-    - Move roaming NPCs (path / global).
+    Advance only the wandering NPCs in one tick bucket. Calling this for
+    bucket 0..NPC_TICK_BUCKETS-1 in turn spreads a full tick over time.
     """
-    from .models import Room  # avoid circular hints
+    await _tick_npcs(world, world.mobile_npcs_in_bucket(bucket % NPC_TICK_BUCKETS))
 
-    # Work on a snapshot so we don't break if the dict changes mid-loop
-    npcs: Dict[str, NPC] = dict(world.npcs)
 
-    for npc in npcs.values():
-        # Tethered NPCs don't move
-        if npc.tethered:
-            continue
-
-        # No wander behavior
-        mode = (npc.wander_mode or "none").lower()
-        if mode == "none":
+async def _tick_npcs(world: World, npcs) -> None:
+    moves = []
+    for npc in npcs:
+        if npc.id not in world.npcs:
             continue
 
+        mode = npc.wander_mode.lower()
         if mode == "path":
-            await _npc_move_along_path(world, npc)
+            moves.append(_npc_move_along_path(world, npc))
         elif mode == "global":
-            await _npc_move_global(world, npc)
+            moves.append(_npc_move_global(world, npc))
         # other modes (radius, faction) can be added later
 
+    # Room notifications for different NPCs don't depend on each other.
+    await asyncio.gather(*moves)
+
 
 async def _npc_move_along_path(world: World, npc: NPC) -> None:
     if not npc.wander_path:
@@ -94,10 +93,10 @@ async def _npc_move_global(world: World, npc: NPC) -> None:
     except KeyError:
         return
 
-    if not room.exits:
+    if not room.exit_values:
         return
 
-    dest_id = random.choice(list(room.exits.values()))
+    dest_id = random.choice(room.exit_values)
     await _move_npc_to(world, npc, dest_id)
 
 
@@ -112,17 +111,27 @@ async def _move_npc_to(world: World, npc: NPC, dest_id: str) -> None:
         return
 
     old_room_id = npc.room_id
-    name = npc.name
 
     # Notify old room sessions
-    for session in world.sessions_in_room(old_room_id):
-        colored_name = colorize(name, "npc_name", session.color_enabled)
-        await session.send_line(f"{colored_name} leaves the room.")
+    await _notify_room(world, old_room_id, npc, "leaves the room.")
 
-    npc.room_id = dest_id
+    # The broadcast yields; the NPC may have been removed meanwhile.
+    if world.npcs.get(npc.id) is not npc:
+        return
+    world.move_npc(npc, dest_id)
 
     # Notify new room sessions
-    for session in world.sessions_in_room(npc.room_id):
-        colored_name = colorize(name, "npc_name", session.color_enabled)
-        await session.send_line(f"{colored_name} enters the room.")
+    await _notify_room(world, npc.room_id, npc, "enters the room.")
+
+
+async def _notify_room(world: World, room_id: str, npc: NPC, action: str) -> None:
+    line_colored = f"{npc.colored_name} {action}"
+    line_plain = f"{npc.name} {action}"
+    await asyncio.gather(
+        *(
+            session.send_line(line_colored if session.color_enabled else line_plain)
+            for session in world.sessions_in_room(room_id)
+        ),
+        return_exceptions=True,
+    )
 
@@ -1,11 +1,24 @@
 # shattered_realms/game/world.py
 
+import sys
 from pathlib import Path
 import yaml
 
+try:
+    # libyaml-backed loader: same safe semantics, much faster parsing
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:  # PyYAML built without libyaml
+    from yaml import SafeLoader
+
 from .models import World, Room
 
 
+def load_yaml(path: Path) -> dict:
+    """Parse a data file with the fastest available safe loader."""
+    with path.open("r", encoding="utf-8") as f:
+        return yaml.load(f, Loader=SafeLoader) or {}
+
+
 def load_world() -> World:
     """
     Load the world (rooms first, then NPCs).
@@ -13,8 +26,7 @@ def load_world() -> World:
     base_dir = Path(__file__).resolve().parent.parent
     rooms_path = base_dir / "data" / "rooms.yml"
 
-    with rooms_path.open("r", encoding="utf-8") as f:
-        raw = yaml.safe_load(f) or {}
+    raw = load_yaml(rooms_path)
 
     world = World()
 
@@ -24,11 +36,14 @@ def load_world() -> World:
             name=data.get("name", room_id),
             description=data.get("description", ""),
             brief=data.get("brief", data.get("name", room_id)),
-            exits=data.get("exits", {}) or {},
+            exits={sys.intern(d): dest for d, dest in (data.get("exits", {}) or {}).items()},
             sanctuary=bool(data.get("sanctuary", False)),
         )
         world.add_room(room)
 
+    # All rooms exist now, so exit names can be resolved once up front
+    world.resolve_exits()
+
     # Load NPCs after rooms so their room_ids are valid
     from .npcs import load_npcs
     load_npcs(world)
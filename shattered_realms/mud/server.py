@@ -1,29 +1,79 @@
 # shattered_realms/mud/server.py
 
 import asyncio
+import re
 import textwrap
-from typing import Optional
+from typing import Iterable, Optional
 
 from ..game.world import load_world
 from ..game.commands import handle_command, cmd_quicklook
-from ..game.models import Player
-from ..game.npcs import npc_tick
-from ..game.colors import colorize   # NEW
+from ..game.models import Player, player_key, ROLE_WIZARD, ROLE_GM, ROLE_ADMIN, NPC_TICK_BUCKETS
+from ..game.npcs import npc_tick_bucket, NPC_MOVE_INTERVAL
+from ..game.colors import colorize_on, colorize_off, variants, variants_bytes
 
 
+# Fancy Unicode punctuation -> plain ASCII, applied in one translate() pass.
+_SANITIZE_TABLE = str.maketrans({
+    "—": "--",
+    "–": "-",
+    "…": "...",
+    "’": "'",
+    "‘": "'",
+    "“": '"',
+    "”": '"',
+})
+
+# Longest input line we'll buffer for a client (asyncio's default is 64 KiB).
+INPUT_LIMIT = 4096
+
+# Temporary: lowercased names that get admin powers on login.
+_ADMIN_NAMES = frozenset({"eddie", "mr_yt", "mryt"})  # choose the ones you want
+
+# Anything that can't appear in a player name.
+_NAME_STRIP_RE = re.compile(r"[^A-Za-z0-9]+")
+
+# Only wait on drain() once this much output is queued for a client
+# (asyncio's default high-water mark); below it drain() is a no-op.
+_DRAIN_THRESHOLD = 64 * 1024
+
+# Shared wrapper for lines that actually need wrapping; textwrap.wrap()
+# would build a new TextWrapper on every call.
+_WRAPPER = textwrap.TextWrapper(width=78)
+
 WELCOME_BANNER = r"""
 ========================================
    Shattered Realms MUD  (v0.1.0)
 ========================================
 """
 
+# (plain, colored) intro lines, colorized once rather than per connection.
+# The banner is plain ASCII well under the wrap width, so it can go out
+# as pre-encoded CRLF bytes without passing through send_line().
+_BANNER_BYTES = tuple(
+    (v.replace("\n", "\r\n") + "\r\n").encode("ascii")
+    for v in variants(WELCOME_BANNER.strip("\n"), "banner")
+)
+_VOID_WIND = variants_bytes("You feel a cold wind as the void takes shape around you.", "system")
+
+# Everything sent before the name prompt, in one write.
+_INTRO_BYTES = tuple(b + w + b"\r\n" for b, w in zip(_BANNER_BYTES, _VOID_WIND))
+
+# Fixed ASCII login text, pre-encoded. (send_line() would strip the
+# prompt's trailing space, so it's sent without one here too.)
+_ASK_NAME_BYTES = b"By what name are you known in the Shattered Realms?\r\n>\r\n"
+_HINT_BYTES = b"Type 'look' for full description, 'ql' for brief, 'quit' to leave.\r\n\r\n"
+
 
 class ClientSession:
     """
     Represents a single connected client.
-    Knows its Player and current room (via Player.room_id).
+    Knows its Player and current room. room_id is a plain attribute (read
+    on every broadcast); change rooms with move_to() so Player.room_id and
+    the world's room index stay in step.
     """
 
+    __slots__ = ("reader", "writer", "world", "player", "room_id", "color_enabled", "colorize", "addr")
+
     # --- Output helpers ---
 
     def _sanitize(self, text: str) -> str:
@@ -31,37 +81,55 @@ class ClientSession:
         Replace fancy Unicode punctuation with plain ASCII so Windows / old
         telnet clients don't puke out ΓÇö and friends.
         """
-        replacements = {
-            "—": "--",
-            "–": "-",
-            "…": "...",
-            "’": "'",
-            "‘": "'",
-            "“": '"',
-            "”": '"',
-        }
-        for bad, good in replacements.items():
-            text = text.replace(bad, good)
-        return text
-
-    def _wrap(self, text: str, width: int = 78) -> str:
-        """
-        Hard-wrap text to a fixed width, preserving explicit newlines.
-        Each input line may turn into multiple output lines.
-        """
-        lines_out: list[str] = []
+        # Most output is plain ASCII already; nothing to replace.
+        if text.isascii():
+            return text
+        return text.translate(_SANITIZE_TABLE)
+
+    def _wrap_into(self, buf: bytearray, text: str, width: int = 78) -> None:
+        """
+        Hard-wrap text to a fixed width, preserving explicit newlines, and
+        append each physical line to buf as UTF-8 with a CRLF ending.
+        A trailing blank line is dropped (unless it is the only line), as
+        clients have always received it.
+        """
+        wrapper = _WRAPPER if width == _WRAPPER.width else textwrap.TextWrapper(width=width)
+
+        # Usual case: ASCII text whose lines all fit, so textwrap would only
+        # trim trailing spaces. CRLF-join and encode it in one go instead of
+        # per line. (\x1f is the one ASCII whitespace char left after tabs
+        # and splitlines(); leave it to the general path below.)
+        if text.isascii() and "\t" not in text and "\x1f" not in text:
+            lines = [line.rstrip(" ") for line in text.splitlines()] or [""]
+            if max(map(len, lines)) <= width:
+                if len(lines) > 1 and not lines[-1]:
+                    lines.pop()
+                buf += "\r\n".join(lines).encode("ascii")
+                buf += b"\r\n"
+                return
+
         # Preserve explicit line breaks coming from descriptions, etc.
+        emitted = 0
+        last_blank = False
         for raw_line in text.splitlines() or [""]:
             line = raw_line.rstrip("\r")
-            if not line:
-                lines_out.append("")
-                continue
-            wrapped = textwrap.wrap(line, width=width)
-            if wrapped:
-                lines_out.extend(wrapped)
+            # Fast path: already fits. textwrap would only strip trailing
+            # spaces (and expand tabs, so leave those to it). Other trailing
+            # whitespace (NBSP, em space, \x1f) it keeps or drops depending
+            # on what precedes it, so those lines go through it too.
+            tail = line[-1:]
+            if len(line) <= width and "\t" not in line and (tail == " " or not tail.isspace()):
+                pieces = [line.rstrip(" ")]
             else:
-                lines_out.append("")
-        return "\n".join(lines_out)
+                pieces = wrapper.wrap(line) or [""]
+            for piece in pieces:
+                buf += piece.encode("utf-8", errors="ignore")
+                buf += b"\r\n"
+            emitted += len(pieces)
+            last_blank = not pieces[-1]
+
+        if emitted > 1 and last_blank:
+            del buf[-2:]
 
 
     def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, world):
@@ -69,32 +137,36 @@ class ClientSession:
         self.writer = writer
         self.world = world
         self.player: Optional[Player] = None
+        self.room_id: str = "lobby"
         self.color_enabled: bool = True  # NEW
+        # colorize(text, style) for this session's current color setting
+        self.colorize = colorize_on
 
         peer = writer.get_extra_info("peername")
         self.addr: Optional[str] = f"{peer[0]}:{peer[1]}" if peer else "unknown"
 
-    # expose room_id like before so commands don't need to change
-    @property
-    def room_id(self) -> str:
-        if self.player is None:
-            return "lobby"
-        return self.player.room_id
-
-    @room_id.setter
-    def room_id(self, value: str) -> None:
+    def move_to(self, room_id: str) -> None:
+        """Move this session (and its player) to another room."""
+        old = self.room_id
+        self.room_id = room_id
         if self.player is not None:
-            self.player.room_id = value
+            self.player.room_id = room_id
+            self.world.move_session(self, old, room_id)
+
+    def set_color(self, enabled: bool) -> None:
+        """Turn color on/off, swapping in the matching colorize function."""
+        self.color_enabled = enabled
+        self.colorize = colorize_on if enabled else colorize_off
 
         # --- Role Helpers ---
     def is_admin(self) -> bool:
-        return self.player and self.player.role == "admin"
+        return self.player is not None and self.player.role_level >= ROLE_ADMIN
 
     def is_gm(self) -> bool:
-        return self.player and self.player.role in ("gm", "admin")
+        return self.player is not None and self.player.role_level >= ROLE_GM
 
     def is_wizard(self) -> bool:
-        return self.player and self.player.role in ("wizard", "gm", "admin")
+        return self.player is not None and self.player.role_level >= ROLE_WIZARD
 
     async def send_line(self, text: str = "") -> None:
         """
@@ -104,16 +176,100 @@ class ClientSession:
         if text is None:
             text = ""
 
-        # Normalize punctuation and wrap for safer display on Windows terminals.
-        safe = self._sanitize(text)
-        wrapped = self._wrap(safe)
+        # Short single-line ASCII (prompts, status lines): nothing to sanitize
+        # or wrap, so skip straight to the bytes.
+        if len(text) <= 78 and text.isascii() and "\n" not in text and "\r" not in text and "\t" not in text:
+            await self.send_raw(text.rstrip().encode("ascii") + b"\r\n")
+            return
+
+        # Normalize punctuation and wrap for safer display on Windows terminals,
+        # straight into the outgoing buffer so the message is one write.
+        buf = bytearray()
+        self._wrap_into(buf, self._sanitize(text))
+        await self.send_raw(buf)
+
+    async def send_raw(self, data: bytes) -> None:
+        """
+        Send already-encoded, CRLF-terminated bytes as-is (no sanitize/wrap).
+        """
+        self.writer.write(data)
+        await self._drain()
 
-        # wrapped may contain internal newlines; send each as its own CRLF line.
-        for line in wrapped.splitlines() or [""]:
-            self.writer.write((line + "\r\n").encode("utf-8", errors="ignore"))
+    async def send_lines(self, lines: Iterable[str]) -> None:
+        """
+        Send several logical lines with a single write, instead
+        of one send_line() round-trip per line.
+        """
+        buf = bytearray()
+        for text in lines:
+            self._wrap_into(buf, self._sanitize(text or ""))
+        self.writer.write(buf)
+        await self._drain()
 
-        await self.writer.drain()
+    async def _drain(self) -> None:
+        """
+        Apply backpressure only when it matters: drain() if the client is
+        falling behind, or if the connection is gone (so the error still
+        reaches the caller instead of writes vanishing silently).
+        """
+        transport = self.writer.transport
+        if transport.is_closing() or transport.get_write_buffer_size() > _DRAIN_THRESHOLD:
+            await self.writer.drain()
+
+
+    async def _notify_others(self, action: str) -> None:
+        """Tell everyone else in this room that our player did `action`."""
+        # Names are short ASCII, so both variants can be encoded once and
+        # sent as-is to every recipient.
+        msgs = (
+            f"{self.player.name} {action}\r\n".encode("ascii"),
+            f"{self.player.colored_name} {action}\r\n".encode("ascii"),
+        )
+        await asyncio.gather(
+            *(
+                other.send_raw(msgs[other.color_enabled])
+                for other in self.world.sessions_in_room(self.room_id)
+                if other is not self
+            ),
+            return_exceptions=True,
+        )
+
+    async def _read_line(self) -> Optional[str]:
+        """
+        Read one line of client input, or None once the client hangs up.
+        Lines over INPUT_LIMIT are discarded in full, up to and including
+        their newline, rather than buffered.
+        """
+        while True:
+            try:
+                line = await self.reader.readuntil(b"\n")
+            except asyncio.IncompleteReadError as e:
+                # EOF; like readline(), hand back any unterminated last line.
+                line = e.partial
+            except asyncio.LimitOverrunError:
+                await self.send_line("That line is too long.")
+                if not await self._discard_line():
+                    return None
+                continue
+            if not line:
+                return None
+            return line.decode("utf-8", errors="ignore")
 
+    async def _discard_line(self) -> bool:
+        """
+        Throw away input through the next newline, however long the line
+        is. Returns False if the client hangs up first.
+        """
+        while True:
+            try:
+                await self.reader.readuntil(b"\n")
+                return True
+            except asyncio.LimitOverrunError as e:
+                # e.consumed bytes are already known not to hold the
+                # newline (or run right up to it); drop them and keep going.
+                await self.reader.readexactly(e.consumed)
+            except asyncio.IncompleteReadError:
+                return False
 
     async def _ask_name(self) -> str:
         """
@@ -121,22 +277,20 @@ class ClientSession:
         and not already in use.
         """
         while True:
-            await self.send_line("By what name are you known in the Shattered Realms?")
-            await self.send_line("> ",)  # simple prompt
-            line = await self.reader.readline()
-            if not line:
+            await self.send_raw(_ASK_NAME_BYTES)
+            line = await self._read_line()
+            if line is None:
                 return "Wanderer"
 
-            raw = line.decode("utf-8", errors="ignore").strip()
-            # sanitize: keep it simple for now
-            name = "".join(ch for ch in raw if ch.isalnum())[:16]
+            raw = line.strip()
+            # sanitize: plain ASCII letters and digits only
+            name = _NAME_STRIP_RE.sub("", raw)[:16]
 
             if not name:
                 await self.send_line("That name rings hollow. Try something else.")
                 continue
 
-            key = name.lower()
-            if key in self.world.players:
+            if player_key(name) in self.world.players:
                 await self.send_line("That name is already in use. Choose another.")
                 continue
 
@@ -145,76 +299,52 @@ class ClientSession:
     async def handle(self) -> None:
         try:
             # Banner
-            await self.send_line(colorize(WELCOME_BANNER.strip("\n"), "banner", self.color_enabled))
-            await self.send_line(colorize("You feel a cold wind as the void takes shape around you.", "system", self.color_enabled))
-            await self.send_line("")
+            await self.send_raw(_INTRO_BYTES[self.color_enabled])
 
             # Ask for a name and create Player
             name = await self._ask_name()
             player = Player(name=name, room_id="lobby")
             # Temporary: assign Admin powers to Eddie only
-            if name.lower() in ("eddie", "mr_yt", "mryt"):   # choose the ones you want
-                player.role = "admin"
+            if name.lower() in _ADMIN_NAMES:
+                player.set_role("admin")
             self.player = player
+            self.room_id = player.room_id
             self.world.add_player(player)
-            self.world.add_session(player.name, self)
-
-            name = player.name
+            self.world.add_session(player, self)
 
             # Notify others already in this room (lobby on login)
-            for other in self.world.sessions_in_room(self.room_id):
-                if other is self:
-                    continue
-                colored_name = colorize(name, "player_name", other.color_enabled)
-                await other.send_line(f"{colored_name} enters the room.")
+            await self._notify_others("enters the room.")
 
 
             # Now talk to this player
-            await self.send_line(f"Welcome, {player.name}.")
-            await self.send_line("Type 'look' for full description, 'ql' for brief, 'quit' to leave.")
-            await self.send_line("")
+            # Names are ASCII alphanumerics, so this needs no sanitize/wrap.
+            await self.send_raw(f"Welcome, {player.name}.\r\n".encode("ascii") + _HINT_BYTES)
 
             # Initial quick look at current room
             await cmd_quicklook(self, [])
 
             # Main loop
             while True:
-                line = await self.reader.readline()
-                if not line:
+                text = await self._read_line()
+                if text is None:
                     break
 
-                text = line.decode("utf-8", errors="ignore")
                 keep_going = await handle_command(self, text)
                 if not keep_going:
                     break
         finally:
             # Clean up player on disconnect
             if self.player is not None:
-                name = self.player.name
-
                 # Notify others in the same room
-                for other in self.world.sessions_in_room(self.room_id):
-                    if other is self:
-                        continue
-                    colored_name = colorize(name, "player_name", other.color_enabled)
-                    await other.send_line(f"{colored_name} leaves the room.")
+                await self._notify_others("leaves the room.")
 
 
                 print(f"{self.player.name} disconnecting from {self.addr}")
-                self.world.remove_session(self.player.name)
-                self.world.remove_player(self.player.name)
+                self.world.remove_session(self.player)
+                self.world.remove_player(self.player)
 
             self.writer.close()
             await self.writer.wait_closed()
-            
-        def is_admin(self) -> bool:
-            return self.player and self.player.role == "admin"
-
-        def is_gm(self) -> bool:
-            return self.player and self.player.role in ("gm", "admin")
-
-        def is_wizard(self) -> bool:
-            return self.player and self.player.role in ("wizard", "gm", "admin")
 
 
 async def run_server(host: str = "0.0.0.0", port: int = 4000) -> None:
@@ -224,18 +354,33 @@ async def run_server(host: str = "0.0.0.0", port: int = 4000) -> None:
         session = ClientSession(reader, writer, world)
         await session.handle()
 
-    # Background NPC loop
+    # Background NPC loop: one bucket of NPCs per step, so every NPC still
+    # moves once per NPC_MOVE_INTERVAL but not all in the same instant.
+    # Steps are scheduled against a fixed deadline, so time spent ticking
+    # doesn't push every later step back.
     async def _npc_loop():
+        loop = asyncio.get_running_loop()
+        step = NPC_MOVE_INTERVAL / NPC_TICK_BUCKETS
+        bucket = 0
+        deadline = loop.time()
         while True:
             try:
-                await npc_tick(world)
+                await npc_tick_bucket(world, bucket)
             except Exception as e:
                 print(f"[NPC LOOP ERROR]: {e}")
-            await asyncio.sleep(10)  # move every 10s for now
+            bucket = (bucket + 1) % NPC_TICK_BUCKETS
+            deadline += step
+            delay = deadline - loop.time()
+            if delay < 0:
+                # Fell behind (slow tick or stalled loop): resync rather
+                # than firing a burst of catch-up steps.
+                deadline -= delay
+                delay = 0
+            await asyncio.sleep(delay)
 
     asyncio.create_task(_npc_loop())
 
-    server = await asyncio.start_server(_client_connected, host, port)
+    server = await asyncio.start_server(_client_connected, host, port, limit=INPUT_LIMIT)
 
     sockets = ", ".join(str(sock.getsockname()) for sock in (server.sockets or []))
     print(f"Shattered Realms listening on {sockets} (connect via nc/telnet)")